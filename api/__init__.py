@@ -1,5 +1,6 @@
 from .ffmpeg_router import api
 from .task_queue import task_queue
-from .task_worker import run_workers
+from .task_store import task_store
+from .task_worker import run_workers, stop_workers
 
-__all__ = ["api", "task_queue", "run_workers"]
+__all__ = ["api", "task_queue", "task_store", "run_workers", "stop_workers"]
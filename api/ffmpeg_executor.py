@@ -1,25 +1,197 @@
 import asyncio
+import itertools
 import os
 import re
 import shlex
 import shutil
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from utils import usable_cpu_count
+
+# Matches {{ key }} placeholders inside command arguments
+_PLACEHOLDER_RE = re.compile(r"{{\s*([^}]+)\s*}}")
+# A placeholder written with inner spaces, e.g. {{ in_1 }}, which shlex would split apart
+_SPACED_PLACEHOLDER_RE = re.compile(r"{{\s*([^{}\s]+)\s*}}")
+_OUTPUT_KEYS = frozenset({"output_filename", "output", "output_path"})
+# Codec options whose value decides whether ffmpeg re-encodes a stream
+_CODEC_OPTIONS = frozenset({"-c", "-codec", "-vcodec", "-acodec", "-scodec"})
+# Filtering re-encodes the streams it applies to, whatever codecs are named
+_FILTER_OPTIONS = ("-vf", "-af", "-filter", "-lavfi")
+
+# Resolved once at import; PATH is not expected to change while the process runs
+_FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Scheduling for encoder processes so they don't starve the API event loop.
+# FFMPEG_NICE=0 disables the nice/ionice wrapper. API_CORES reserves the first N cores
+# for the API; ENCODE_CORES limits encoders to that many cores after them (0 = all).
+_FFMPEG_NICE = int(os.getenv("FFMPEG_NICE", "10"))
+_API_CORES = int(os.getenv("API_CORES", "0"))
+_ENCODE_CORES = int(os.getenv("ENCODE_CORES", "0"))
+
+
+def _priority_prefix() -> list[str]:
+    """Build the nice/ionice wrapper for encoder processes (empty if unavailable)."""
+    if os.name != "posix" or _FFMPEG_NICE <= 0:
+        return []
+    prefix = []
+    nice_path = shutil.which("nice")
+    if nice_path:
+        prefix += [nice_path, "-n", str(_FFMPEG_NICE)]
+    ionice_path = shutil.which("ionice")
+    if ionice_path:
+        prefix += [ionice_path, "-c", "2", "-n", "5"]
+    return prefix
+
+
+def _encode_cpu_set() -> set[int] | None:
+    """Cores encoder processes are pinned to, or None to leave affinity alone."""
+    if not hasattr(os, "sched_setaffinity") or (_API_CORES <= 0 and _ENCODE_CORES <= 0):
+        return None
+    cpu_count = os.cpu_count() or 1
+    end = cpu_count if _ENCODE_CORES <= 0 else min(cpu_count, _API_CORES + _ENCODE_CORES)
+    return set(range(_API_CORES, end)) or None
+
+
+_PRIORITY_PREFIX = _priority_prefix()
+_ENCODE_CPUS = _encode_cpu_set()
+
+
+def encoder_cpu_count() -> int:
+    """CPUs encoder processes may use: the pinned set if any, else every usable CPU."""
+    return len(_ENCODE_CPUS) if _ENCODE_CPUS else usable_cpu_count()
+
+
+async def read_stream_tail(
+    stream: asyncio.StreamReader, max_chunks: int = 32, chunk_size: int = 4096
+) -> str:
+    """Drain a subprocess stream, keeping only its last max_chunks * chunk_size bytes."""
+    tail: deque[bytes] = deque(maxlen=max_chunks)
+    while chunk := await stream.read(chunk_size):
+        tail.append(chunk)
+    return b"".join(tail).decode(errors="replace")
+
+
+@asynccontextmanager
+async def reap_on_error(
+    process: asyncio.subprocess.Process,
+) -> AsyncIterator[asyncio.subprocess.Process]:
+    """Kill and wait for the process if the block exits with an error or is cancelled.
+
+    Without this, a cancelled worker (e.g. on a shutdown timeout) leaves ffmpeg running.
+    """
+    try:
+        yield process
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+
+@lru_cache(maxsize=128)
+def compile_command(command_args: str) -> Callable[[dict[str, str]], list[str]]:
+    """Tokenize a command template once and return a builder for its argv.
+
+    The builder takes a placeholder -> value mapping and fills in every {{ key }}.
+    Unknown placeholders are left unchanged. Results are cached per template, since
+    most tasks reuse a handful of well-known commands.
+
+    Raises:
+        ValueError: If the command cannot be tokenized (e.g. unbalanced quotes)
+    """
+    # Each token becomes (pieces, tail): pieces are (literal, key, raw placeholder)
+    compiled: list[tuple[tuple[tuple[str, str, str], ...], str]] = []
+    # Tighten {{ key }} to {{key}} first so a spaced placeholder stays one token
+    command_args = _SPACED_PLACEHOLDER_RE.sub(r"{{\1}}", command_args)
+    for token in shlex.split(command_args, posix=True):
+        pieces = []
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(token):
+            pieces.append((token[pos : match.start()], match.group(1).strip(), match.group(0)))
+            pos = match.end()
+        compiled.append((tuple(pieces), token[pos:]))
+
+    def build(subs: dict[str, str]) -> list[str]:
+        return [
+            "".join([lit + subs.get(key, raw) for lit, key, raw in pieces]) + tail
+            if pieces
+            else tail
+            for pieces, tail in compiled
+        ]
+
+    return build
+
+
+@lru_cache(maxsize=128)
+def is_stream_copy(command_args: str) -> bool:
+    """Whether a command only remuxes.
+
+    It must set codecs, every codec must be "copy", and no filter option
+    (-vf, -af, -filter*, -lavfi) may force a re-encode.
+    """
+    try:
+        tokens = shlex.split(command_args, posix=True)
+    except ValueError:
+        return False
+    if any(token.startswith(_FILTER_OPTIONS) for token in tokens):
+        return False
+    codecs = [
+        value
+        for option, value in itertools.pairwise(tokens)
+        if option in _CODEC_OPTIONS or option.startswith(("-c:", "-codec:"))
+    ]
+    return bool(codecs) and all(codec == "copy" for codec in codecs)
 
 
 class FFmpegExecutor:
     """Handles FFmpeg command execution with simple placeholder templating.
 
     Supported placeholders inside command_args:
-    - {{ output_filename }} -> replaced with shell-quoted output path
+    - {{ output_filename }} -> replaced with the output path
     - {{ in_N }} (e.g. {{ in_1 }}) -> replaced with Nth input file path (1-based)
     - {{ <input_key> }} -> if input_key matches a key in input_files, replaced with that path
 
     If no output placeholder is present, the output_path will be appended to the command.
+
+    The command is tokenized with shlex and executed directly (no intermediate shell),
+    so shell constructs such as pipes or process substitution are not supported.
     """
 
     @staticmethod
     def check_ffmpeg_installed() -> bool:
         """Check if FFmpeg is installed on the system."""
-        return shutil.which("ffmpeg") is not None
+        return _FFMPEG_PATH is not None
+
+    @staticmethod
+    def ffmpeg_path() -> str:
+        """Path of the ffmpeg binary for argv lists built outside execute().
+
+        Raises:
+            RuntimeError: If FFmpeg is not installed on the system
+        """
+        if _FFMPEG_PATH is None:
+            raise RuntimeError("FFmpeg is not installed on the system")
+        return _FFMPEG_PATH
+
+    @staticmethod
+    async def spawn(argv: list[str], **kwargs) -> asyncio.subprocess.Process:
+        """Start an encoder process at lowered priority, pinned to the encode cores.
+
+        Args:
+            argv: Command and arguments, starting with the binary to run
+            **kwargs: Passed to asyncio.create_subprocess_exec (stdout, stderr, ...)
+        """
+        process = await asyncio.create_subprocess_exec(*_PRIORITY_PREFIX, *argv, **kwargs)
+        if _ENCODE_CPUS:
+            try:
+                # exec() keeps the affinity, so pinning the wrapper pins ffmpeg too
+                os.sched_setaffinity(process.pid, _ENCODE_CPUS)
+            except OSError:
+                pass  # Process already exited
+        return process
 
     @staticmethod
     async def execute(
@@ -38,73 +210,54 @@ class FFmpegExecutor:
         Returns:
             Tuple of (success: bool, error_message: Optional[str])
         """
-        if not FFmpegExecutor.check_ffmpeg_installed():
+        ffmpeg_path = _FFMPEG_PATH
+        if ffmpeg_path is None:
             return False, "FFmpeg is not installed on the system"
 
-        # Work on a copy
-        command_str = command_args
-
-        # Prepare ordered list of input paths for in_1, in_2, ...
-        # Ensure all are absolute paths (defensive, but should already be absolute)
-        ordered_inputs = [os.path.abspath(p) for p in input_files.values()]
-
-        # Helper to shell-quote paths
-        def q(path: str) -> str:
-            return shlex.quote(path)
-
-        # Replace {{ ... }} placeholders
-        pattern = re.compile(r"{{\s*([^}]+)\s*}}")
-
-        def replace_placeholder(match: re.Match) -> str:
-            key = match.group(1)
-            # output placeholder: check output_files mapping first
-            if key in ("output_filename", "output", "output_path"):
-                return q(output_path) if output_path is not None else match.group(0)
-            # named output keys (e.g. out_1)
-            if output_files and key in output_files:
-                return q(output_files[key])
-            # in_N placeholder
-            m = re.fullmatch(r"in_(\d+)", key)
-            if m:
-                idx = int(m.group(1)) - 1
-                if 0 <= idx < len(ordered_inputs):
-                    return q(ordered_inputs[idx])
-                return match.group(0)
-            # direct input key (match against input_files keys)
-            if key in input_files:
-                # Always use the absolute path, never join again
-                return q(os.path.abspath(input_files[key]))
-            # unknown placeholder -> leave unchanged
-            return match.group(0)
-
-        command_str = pattern.sub(replace_placeholder, command_str)
-
-        # Remove legacy replacement of non-placeholder input filenames to avoid accidental double paths
-        # (No longer needed and can cause double temp dir issues)
+        # Build the placeholder -> path table once. Later entries take precedence:
+        # direct input keys, then in_N (1-based input order), then named outputs,
+        # then the generic output placeholders.
+        # Ensure all local input paths are absolute (defensive, but should already be
+        # absolute); URLs streamed straight to ffmpeg are left as they are
+        ordered_inputs = [p if "://" in p else os.path.abspath(p) for p in input_files.values()]
+        subs = dict(zip(input_files.keys(), ordered_inputs, strict=True))
+        subs.update((f"in_{i}", path) for i, path in enumerate(ordered_inputs, 1))
+        if output_files:
+            subs.update(output_files)
+        if output_path is not None:
+            subs.update(dict.fromkeys(_OUTPUT_KEYS, output_path))
+
+        # Paths are passed verbatim as argv entries, so no shell quoting is needed.
+        try:
+            argv = compile_command(command_args)(subs)
+        except ValueError as e:
+            return False, f"Invalid FFmpeg command: {str(e)}"
 
         # If command doesn't contain an explicit output placeholder and a single output_path provided,
         # append the output path (legacy behavior). If multiple output_files provided, do not auto-append.
         if (not output_files) and (
-            "{{" not in command_args and "output" not in command_str and output_path
+            "{{" not in command_args and "output" not in command_args and output_path
         ):
-            command_str = f"{command_str} {q(output_path)}"
+            argv.append(output_path)
 
-        # Ensure the command is prefixed with ffmpeg
-        full_command = command_str.strip()
-        if not full_command.startswith("ffmpeg"):
-            full_command = f"ffmpeg {full_command}"
+        # Ensure the command is prefixed with the resolved ffmpeg binary
+        if argv and argv[0] == "ffmpeg":
+            argv[0] = ffmpeg_path
+        else:
+            argv.insert(0, ffmpeg_path)
 
         try:
-            process = await asyncio.create_subprocess_shell(
-                full_command,
-                stdout=asyncio.subprocess.PIPE,
+            process = await FFmpegExecutor.spawn(
+                argv,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE,
             )
 
-            stdout, stderr = await process.communicate()
+            async with reap_on_error(process):
+                error_msg = await read_stream_tail(process.stderr) if process.stderr else ""
+                await process.wait()
 
             if process.returncode != 0:
-                error_msg = stderr.decode() if stderr else stdout.decode()
                 return False, f"FFmpeg error: {error_msg}"
 
             return True, None
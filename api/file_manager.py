@@ -1,9 +1,77 @@
+import asyncio
+import logging
 import os
 import mimetypes
 import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import BinaryIO
 
 import httpx
 
+from utils import gather_or_cancel
+
+logger = logging.getLogger(__name__)
+
+_DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+# Cap on in-flight input downloads per task, so multi-input tasks do not open a connection storm
+_MAX_CONCURRENT_DOWNLOADS = int(os.getenv("DOWNLOAD_CONCURRENCY", "8"))
+# Outputs below this size are uploaded with a single streamed presigned PUT,
+# larger ones as a multipart upload with parts sent concurrently
+_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+_MULTIPART_PART_SIZE = 16 * 1024 * 1024
+_MAX_CONCURRENT_PARTS = 8
+_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+_SIGN_URLS = os.getenv("S3_SIGN_URLS", "true").lower() in ("true", "1", "yes")
+
+
+async def _aiter_file(fh: BinaryIO, chunk_size: int = _UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield fixed-size chunks of an open file, reading in a worker thread."""
+    while chunk := await asyncio.to_thread(fh.read, chunk_size):
+        yield chunk
+
+
+async def _aiter_stream(
+    stream: asyncio.StreamReader, chunk_size: int = _MULTIPART_PART_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield fixed-size chunks of a stream until EOF; only the last one may be shorter."""
+    while True:
+        try:
+            yield await stream.readexactly(chunk_size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                yield e.partial
+            return
+
+
+# One HTTP client for every FileManager in the process, so input downloads and presigned
+# uploads keep their connections (and TLS sessions) alive from one task to the next
+_shared_http: httpx.AsyncClient | None = None
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0),
+        limits=httpx.Limits(
+            max_connections=200, max_keepalive_connections=32, keepalive_expiry=75.0
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _shared_http
+    if _shared_http is None or _shared_http.is_closed:
+        _shared_http = _new_http_client()
+    return _shared_http
+
+
+async def close_http_client() -> None:
+    """Close the process-wide HTTP client (on shutdown)."""
+    global _shared_http
+    if _shared_http is not None:
+        await _shared_http.aclose()
+        _shared_http = None
+
 
 class FileManager:
     """Handles file download and S3 upload operations."""
@@ -15,19 +83,28 @@ class FileManager:
         aws_secret_access_key: str,
         aws_region: str = "us-east-1",
         s3_url: str | None = None,
+        s3_client=None,
+        http_client: httpx.AsyncClient | None = None,
     ):
         from .s3_singleton import S3ClientSingleton
 
         self.s3_bucket = s3_bucket
         self.temp_dir = tempfile.mkdtemp()
-        S3ClientSingleton.configure(
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            aws_region=aws_region,
-            s3_url=s3_url,
-        )
-        self.s3_client = S3ClientSingleton.get_client()
+        # Prefer the process-wide client; only configure one here if none was injected
+        if s3_client is None:
+            S3ClientSingleton.configure(
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                aws_region=aws_region,
+                s3_url=s3_url,
+            )
+            s3_client = S3ClientSingleton.get_client()
+        self.s3_client = s3_client
         self.s3_url = s3_url
+        self._download_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_DOWNLOADS)
+        # An injected client is shared and outlives this FileManager; otherwise own one
+        self._owns_http = http_client is None
+        self._http = _new_http_client() if http_client is None else http_client
 
     async def download_file(self, url: str, filename: str) -> str:
         """Download a file from URL and save it locally.
@@ -39,37 +116,40 @@ class FileManager:
         Returns:
             Path to the downloaded file
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
+        file_path = os.path.join(self.temp_dir, filename)
+        async with self._download_semaphore:
+            # Stream the body to disk so memory use stays at one chunk per download
+            async with self._http.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(file_path, "wb", buffering=_DOWNLOAD_CHUNK_SIZE) as f:
+                    async for chunk in response.aiter_bytes(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
 
-            file_path = os.path.join(self.temp_dir, filename)
-            with open(file_path, "wb") as f:
-                f.write(response.content)
-
-            return file_path
+        return file_path
 
     async def download_files(self, input_files: dict[str, str]) -> dict[str, str]:
-        """Download multiple files and log file existence and size after download."""
-        import logging
-
-        local_paths = {}
-        logger = logging.getLogger(__name__)
-        logger.info(f"Using temp directory: {self.temp_dir}")
-        for filename, url in input_files.items():
-            local_path = await self.download_file(url, filename)
-            local_paths[filename] = local_path
-            # Log file existence and size
-            if os.path.exists(local_path):
-                size = os.path.getsize(local_path)
-                logger.info(f"Downloaded {filename} to {local_path} (size: {size} bytes)")
-            else:
-                logger.error(f"File {local_path} does not exist after download!")
+        """Download multiple files concurrently; sizes are logged at DEBUG level."""
+        logger.debug("Using temp directory: %s", self.temp_dir)
+        results = await gather_or_cancel(
+            *(self.download_file(url, filename) for filename, url in input_files.items())
+        )
+        local_paths = dict(zip(input_files.keys(), results, strict=True))
+        if logger.isEnabledFor(logging.DEBUG):
+            # Only stat the files when the sizes will actually be logged
+            for filename, local_path in local_paths.items():
+                if os.path.exists(local_path):
+                    size = os.path.getsize(local_path)
+                    logger.debug("Downloaded %s to %s (size: %d bytes)", filename, local_path, size)
+                else:
+                    logger.error("File %s does not exist after download!", local_path)
         return local_paths
 
 
     def upload_to_s3(self, file_path: str, s3_key: str) -> str:
-        """Upload a file to S3 bucket and return either a public URL or a 7-day pre-signed HTTP URL, depending on S3_SIGN_URLS env var. Sets content-type metadata."""
+        """Upload a file to S3 bucket and return either a public URL or a 7-day pre-signed HTTP URL, depending on S3_SIGN_URLS env var. Sets content-type metadata.
+
+        This call blocks; from async code run it via asyncio.to_thread.
+        """
         content_type, _ = mimetypes.guess_type(file_path)
         extra_args = {"ContentType": content_type} if content_type else {}
         with open(file_path, "rb") as f:
@@ -77,11 +157,147 @@ class FileManager:
                 f,
                 self.s3_bucket,
                 s3_key,
-                ExtraArgs=extra_args if extra_args else None
+                ExtraArgs=extra_args if extra_args else None,
             )
 
-        sign_urls = os.getenv("S3_SIGN_URLS", "true").lower() in ("true", "1", "yes")
-        if sign_urls:
+        return self.get_object_url(s3_key)
+
+    async def upload_to_s3_async(self, file_path: str, s3_key: str) -> str:
+        """Upload a file to S3 without blocking the event loop and return its URL.
+
+        Small files are streamed over the pooled HTTP client with a single presigned
+        PUT; larger files go through upload_to_s3_multipart.
+        """
+        size = os.path.getsize(file_path)
+        if size >= _MULTIPART_THRESHOLD:
+            return await self.upload_to_s3_multipart(file_path, s3_key)
+
+        content_type, _ = mimetypes.guess_type(file_path)
+        params = {"Bucket": self.s3_bucket, "Key": s3_key}
+        # S3 rejects chunked PUTs, so the length is always sent explicitly
+        headers = {"Content-Length": str(size)}
+        if content_type:
+            params["ContentType"] = content_type
+            headers["Content-Type"] = content_type
+        presigned_put = self.s3_client.generate_presigned_url(
+            "put_object", Params=params, ExpiresIn=3600
+        )
+        with open(file_path, "rb") as fh:
+            response = await self._http.put(presigned_put, content=_aiter_file(fh), headers=headers)
+        response.raise_for_status()
+
+        return self.get_object_url(s3_key)
+
+    async def upload_to_s3_multipart(
+        self, file_path: str, s3_key: str, part_size: int = _MULTIPART_PART_SIZE
+    ) -> str:
+        """Upload a large file as an S3 multipart upload and return its URL."""
+        content_type, _ = mimetypes.guess_type(file_path)
+        with open(file_path, "rb") as fh:
+            url = await self._multipart_upload(s3_key, content_type, _aiter_file(fh, part_size))
+        assert url is not None
+        return url
+
+    async def upload_stream_to_s3(
+        self,
+        stream: asyncio.StreamReader,
+        s3_key: str,
+        content_type: str | None = None,
+        should_complete: Callable[[], Awaitable[bool]] | None = None,
+        part_size: int = _MULTIPART_PART_SIZE,
+    ) -> str | None:
+        """Upload a stream (e.g. ffmpeg's stdout) to S3 part by part as it is produced.
+
+        Args:
+            stream: Stream to read until EOF
+            s3_key: Destination key
+            content_type: Content-Type stored with the object
+            should_complete: Awaited once the stream is fully uploaded; if it returns
+                False the upload is aborted (e.g. the producing process failed)
+            part_size: Multipart part size (S3 requires at least 5 MiB)
+
+        Returns:
+            The object URL, or None if the upload was aborted by should_complete
+        """
+        return await self._multipart_upload(
+            s3_key, content_type, _aiter_stream(stream, part_size), should_complete
+        )
+
+    async def _multipart_upload(
+        self,
+        s3_key: str,
+        content_type: str | None,
+        chunks: AsyncIterator[bytes],
+        should_complete: Callable[[], Awaitable[bool]] | None = None,
+    ) -> str | None:
+        """Send each chunk as one part of a multipart upload, at most 8 parts in flight.
+
+        Parts go to presigned upload_part URLs over the pooled HTTP client. The upload
+        is aborted if any part fails or should_complete returns False.
+        """
+        create_args = {"Bucket": self.s3_bucket, "Key": s3_key}
+        if content_type:
+            create_args["ContentType"] = content_type
+        upload = await asyncio.to_thread(self.s3_client.create_multipart_upload, **create_args)
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_PARTS)
+
+        async def upload_part(part_number: int, data: bytes) -> dict:
+            try:
+                presigned_part = self.s3_client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": self.s3_bucket,
+                        "Key": s3_key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=3600,
+                )
+                response = await self._http.put(presigned_part, content=data)
+                response.raise_for_status()
+                return {"PartNumber": part_number, "ETag": response.headers["ETag"]}
+            finally:
+                semaphore.release()
+
+        async def abort() -> None:
+            await asyncio.to_thread(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.s3_bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+            )
+
+        pending: list[asyncio.Task] = []
+        try:
+            part_number = 0
+            async for data in chunks:
+                # Bounds both the parts in flight and the chunks held in memory
+                await semaphore.acquire()
+                part_number += 1
+                pending.append(asyncio.create_task(upload_part(part_number, data)))
+            parts = await asyncio.gather(*pending)
+            if should_complete is not None and not await should_complete():
+                await abort()
+                return None
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.s3_bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": list(parts)},
+            )
+        except BaseException:
+            for part in pending:
+                part.cancel()
+            await abort()
+            raise
+
+        return self.get_object_url(s3_key)
+
+    def get_object_url(self, s3_key: str) -> str:
+        """Return either a public URL or a 7-day pre-signed HTTP URL for an uploaded key."""
+        if _SIGN_URLS:
             # Generate a pre-signed HTTP URL valid for 7 days (604800 seconds)
             presigned_url = self.s3_client.generate_presigned_url(
                 "get_object",
@@ -104,6 +320,12 @@ class FileManager:
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
 
+    async def aclose(self) -> None:
+        """Close the HTTP client (unless it is shared) and clean up temporary files."""
+        if self._owns_http:
+            await self._http.aclose()
+        self.cleanup()
+
     def get_temp_file_path(self, filename: str) -> str:
         """Get path for a file in the temp directory, unless already absolute."""
         if os.path.isabs(filename):
@@ -41,6 +41,16 @@ class TaskResponse(BaseModel):
 class Task:
     """In-memory task storage."""
 
+    __slots__ = (
+        "task_id",
+        "command",
+        "input_files",
+        "output_files",
+        "status",
+        "output_urls",
+        "error_message",
+    )
+
     def __init__(
         self,
         task_id: str,
@@ -58,9 +68,36 @@ class Task:
         self.error_message: str | None = None
 
     def to_response(self) -> TaskResponse:
-        return TaskResponse(
+        # Fields come from this controlled object, so skip validation on the hot /status path
+        return TaskResponse.model_construct(
             task_id=self.task_id,
             status=self.status,
             output_urls=self.output_urls,
             error_message=self.error_message,
         )
+
+    def to_dict(self) -> dict:
+        """Serialize the task for storage in an external backend."""
+        return {
+            "task_id": self.task_id,
+            "command": self.command,
+            "input_files": self.input_files,
+            "output_files": self.output_files,
+            "status": self.status.value,
+            "output_urls": self.output_urls,
+            "error_message": self.error_message,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Task":
+        """Rebuild a task serialized with to_dict."""
+        task = cls(
+            task_id=data["task_id"],
+            command=data["command"],
+            input_files=data["input_files"],
+            output_files=data["output_files"],
+        )
+        task.status = TaskStatus(data["status"])
+        task.output_urls = data.get("output_urls")
+        task.error_message = data.get("error_message")
+        return task
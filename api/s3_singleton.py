@@ -1,13 +1,19 @@
 import os
-from typing import Optional
+import threading
+from typing import Any
 
-import boto3
-from botocore.client import Config
+from utils import io_concurrency
+
+# One client is shared by every worker in the process, so size its pool for the
+# transfers that may run at once, whatever the number of workers
+_MAX_POOL_CONNECTIONS = max(50, io_concurrency())
 
 
 class S3ClientSingleton:
-    _client: Optional[boto3.client] | None = None  # noqa # type: ignore
+    _client: Any | None = None  # boto3 S3 client
     _config: dict | None = None
+    # configure() may run from several threads (asyncio.to_thread callers)
+    _lock = threading.Lock()
 
     @classmethod
     def configure(
@@ -33,13 +39,29 @@ class S3ClientSingleton:
         # )
         # print(f"[S3 DEBUG] Using bucket: {os.environ.get('S3_BUCKET')}")
 
-        cls._config = client_kwargs
-        cls._client = boto3.client(
-            **client_kwargs,
-            config=Config(
-                signature_version="s3v4",  # Usually needed for path-style
-            ),
-        )
+        # boto3 is imported here so importing this module stays cheap
+        import boto3
+        from botocore.client import Config
+
+        with cls._lock:
+            # Building a boto3 client is slow; reuse the existing one if nothing changed
+            if cls._client is not None and cls._config == client_kwargs:
+                return
+
+            cls._config = client_kwargs
+            cls._client = boto3.client(
+                **client_kwargs,
+                config=Config(
+                    signature_version="s3v4",  # Usually needed for path-style
+                    max_pool_connections=_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    # Fail fast on an unreachable endpoint; the read timeout leaves room
+                    # for S3 to acknowledge a 16 MiB part
+                    connect_timeout=2,
+                    read_timeout=30,
+                    retries={"max_attempts": 3, "mode": "adaptive"},
+                ),
+            )
 
     @classmethod
     def get_client(cls):
@@ -48,3 +70,38 @@ class S3ClientSingleton:
                 "S3 client not configured. Call S3ClientSingleton.configure() first."
             )
         return cls._client
+
+    @classmethod
+    def probe_client(cls):
+        """A new client with the shared settings that fails fast, for connectivity checks.
+
+        Each call is one attempt with 2 s timeouts, so the caller decides on retries and
+        bounds the total wait. The caller closes it.
+        """
+        import boto3
+        from botocore.client import Config
+
+        with cls._lock:
+            if cls._config is None:
+                raise RuntimeError(
+                    "S3 client not configured. Call S3ClientSingleton.configure() first."
+                )
+            client_kwargs = dict(cls._config)
+        return boto3.client(
+            **client_kwargs,
+            config=Config(
+                signature_version="s3v4",
+                connect_timeout=2,
+                read_timeout=2,
+                retries={"max_attempts": 1, "mode": "standard"},
+            ),
+        )
+
+    @classmethod
+    def close(cls) -> None:
+        """Close the shared client's connection pool; the next configure() builds a new one."""
+        with cls._lock:
+            if cls._client is not None:
+                cls._client.close()
+            cls._client = None
+            cls._config = None
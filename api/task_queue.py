@@ -1,9 +1,16 @@
 import asyncio
+import json
+import logging
+import os
+import socket
 from collections.abc import Callable
 from enum import Enum
+from typing import cast
 
 from .models import Task
 
+logger = logging.getLogger(__name__)
+
 
 class TaskEvent(str, Enum):
     """Events that can be published from workers."""
@@ -28,6 +35,20 @@ class TaskQueue:
         """Get the next task from the queue."""
         return await self._queue.get()
 
+    async def dequeue_many(self, max_n: int) -> list[Task]:
+        """Wait for one task, then take up to max_n - 1 more that are already queued."""
+        tasks = [await self._queue.get()]
+        while len(tasks) < max_n:
+            try:
+                tasks.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return tasks
+
+    async def task_done(self, task: Task) -> None:
+        """Mark a dequeued task as fully processed."""
+        self._queue.task_done()
+
     async def size(self) -> int:
         """Get the current queue size."""
         return self._queue.qsize()
@@ -45,5 +66,145 @@ class TaskQueue:
                 callback(task)
 
 
+class RedisTaskQueue(TaskQueue):
+    """Task queue backed by a Redis Stream, shared by every API and worker process.
+
+    Workers read through a consumer group, so each task is delivered to one worker.
+    Messages are acknowledged in task_done. While a task runs, its consumer keeps
+    resetting the message's idle time; a message idle for longer than claim_idle
+    seconds belongs to a consumer that died, and the next worker to look claims it.
+    Event callbacks are still local to the process that publishes them.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        stream: str = "ffmpeg:tasks",
+        group: str = "ffmpeg-workers",
+        consumer: str | None = None,
+        claim_idle: float = 300.0,
+    ):
+        import redis.asyncio as redis
+
+        super().__init__()
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._stream = stream
+        self._group = group
+        # One consumer per process: sibling API/worker processes on a host must not share one
+        self._consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._claim_idle_ms = int(claim_idle * 1000)
+        self._claim_cursor = "0-0"
+        self._setup_lock = asyncio.Lock()
+        self._group_ready = False
+        self._heartbeat: asyncio.Task | None = None
+        self._message_ids: dict[str, str] = {}
+
+    async def _ensure_group(self) -> None:
+        async with self._setup_lock:
+            if self._group_ready:
+                return
+            from redis.exceptions import ResponseError
+
+            try:
+                await self._redis.xgroup_create(self._stream, self._group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._heartbeat = asyncio.create_task(self._keep_claimed())
+            self._group_ready = True
+
+    async def _keep_claimed(self) -> None:
+        """Reset the idle time of this consumer's in-flight messages so nobody reclaims them."""
+        while True:
+            await asyncio.sleep(self._claim_idle_ms / 3000)
+            if not self._message_ids:
+                continue
+            try:
+                await self._redis.xclaim(
+                    self._stream,
+                    self._group,
+                    self._consumer,
+                    0,
+                    list(self._message_ids.values()),
+                    justid=True,
+                )
+            except Exception as e:
+                logger.warning("Could not refresh in-flight Redis tasks: %s", e)
+
+    async def _claim_abandoned(self, max_n: int) -> list[tuple[str, dict]]:
+        """Take over up to max_n messages left pending by consumers that stopped."""
+        response = await self._redis.xautoclaim(
+            self._stream,
+            self._group,
+            self._consumer,
+            self._claim_idle_ms,
+            start_id=self._claim_cursor,
+            count=max_n,
+        )
+        self._claim_cursor = response[0]
+        return response[1]
+
+    async def enqueue(self, task: Task) -> None:
+        """Add a task to the stream."""
+        await self._redis.xadd(self._stream, {"task": json.dumps(task.to_dict())})
+
+    async def dequeue(self) -> Task:
+        """Block until a task is delivered to this consumer."""
+        return (await self.dequeue_many(1))[0]
+
+    async def dequeue_many(self, max_n: int) -> list[Task]:
+        """Block until at least one task is delivered, returning up to max_n of them."""
+        await self._ensure_group()
+        tasks: list[Task] = []
+        while not tasks:
+            messages = await self._claim_abandoned(max_n)
+            if not messages:
+                # Wake up now and then to look for abandoned messages again
+                response = await self._redis.xreadgroup(
+                    self._group,
+                    self._consumer,
+                    {self._stream: ">"},
+                    count=max_n,
+                    block=self._claim_idle_ms,
+                )
+                if not response:
+                    continue
+                # A single-stream read returns [[stream, [(message_id, fields), ...]]]
+                read = cast(list[tuple[str, list[tuple[str, dict]]]], response)
+                messages = read[0][1]
+            for message_id, fields in messages:
+                if not fields:
+                    # Entry was deleted while still pending; drop it from the group
+                    await self._redis.xack(self._stream, self._group, message_id)
+                    continue
+                task = Task.from_dict(json.loads(fields["task"]))
+                self._message_ids[task.task_id] = message_id
+                tasks.append(task)
+        return tasks
+
+    async def task_done(self, task: Task) -> None:
+        """Acknowledge and remove the task's stream entry."""
+        message_id = self._message_ids.pop(task.task_id, None)
+        if message_id is None:
+            return
+        await self._redis.xack(self._stream, self._group, message_id)
+        await self._redis.xdel(self._stream, message_id)
+
+    async def size(self) -> int:
+        """Get the number of tasks not yet acknowledged."""
+        return await self._redis.xlen(self._stream)
+
+
+def create_task_queue() -> TaskQueue:
+    """Create the task queue for the backend selected by TASK_BACKEND (memory|redis)."""
+    if os.getenv("TASK_BACKEND", "memory").lower() == "redis":
+        return RedisTaskQueue(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            consumer=os.getenv("WORKER_NAME") or None,
+            claim_idle=float(os.getenv("REDIS_CLAIM_IDLE", "300")),
+        )
+    return TaskQueue()
+
+
 # Global task queue instance
-task_queue = TaskQueue()
+task_queue = create_task_queue()
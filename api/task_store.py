@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .models import Task, TaskStatus
+from .task_queue import TaskEvent, task_queue
+
+_TERMINAL_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED})
+
+
+class TaskStore:
+    """Bounded in-memory task storage.
+
+    Keeps at most `maxsize` tasks and drops finished tasks `ttl` seconds after they
+    finished. When full, the longest-finished task is evicted first; queued and
+    running tasks only go once no finished task is left.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Each entry carries the time it was last stored, i.e. when it finished for done tasks
+        self._tasks: OrderedDict[str, tuple[float, Task]] = OrderedDict()
+        # IDs of finished tasks, in the order they finished
+        self._finished: OrderedDict[str, None] = OrderedDict()
+
+    async def get(self, task_id: str) -> Task | None:
+        """Get a task by ID, or None if unknown or evicted."""
+        entry = self._tasks.get(task_id)
+        return entry[1] if entry else None
+
+    async def put(self, task: Task) -> None:
+        """Store a task, evicting the oldest entries when full."""
+        self._tasks[task.task_id] = (time.monotonic(), task)
+        self._tasks.move_to_end(task.task_id)
+        if task.status in _TERMINAL_STATUSES:
+            self._finished[task.task_id] = None
+            self._finished.move_to_end(task.task_id)
+        else:
+            self._finished.pop(task.task_id, None)
+        while len(self._tasks) > self.maxsize:
+            if self._finished:
+                del self._tasks[self._finished.popitem(last=False)[0]]
+            else:
+                self._tasks.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def sweep(self) -> None:
+        """Remove tasks that finished more than the TTL ago."""
+        cutoff = time.monotonic() - self.ttl
+        while self._finished:
+            task_id = next(iter(self._finished))
+            if self._tasks[task_id][0] >= cutoff:
+                break
+            del self._finished[task_id]
+            del self._tasks[task_id]
+
+    async def run_reaper(self, interval: float = 60.0) -> None:
+        """Periodically sweep expired tasks until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+
+class RedisTaskStore:
+    """Task storage in Redis, shared by every API and worker process.
+
+    Tasks are stored as JSON under `task:{id}` and expire after `ttl` seconds.
+    """
+
+    def __init__(self, url: str, ttl: int = 86400):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, task_id: str) -> Task | None:
+        """Get a task by ID, or None if unknown or expired."""
+        data = await self._redis.get(f"task:{task_id}")
+        return Task.from_dict(json.loads(data)) if data else None
+
+    async def put(self, task: Task) -> None:
+        """Store or overwrite a task."""
+        await self._redis.set(f"task:{task.task_id}", json.dumps(task.to_dict()), ex=self.ttl)
+
+    async def run_reaper(self, interval: float = 60.0) -> None:
+        """No-op: Redis expires tasks on its own."""
+
+
+def create_task_store() -> TaskStore | RedisTaskStore:
+    """Create the task store for the backend selected by TASK_BACKEND (memory|redis)."""
+    if os.getenv("TASK_BACKEND", "memory").lower() == "redis":
+        redis_store = RedisTaskStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        # Workers update task objects they dequeued, so persist every status change
+        for event in TaskEvent:
+            task_queue.subscribe(event, redis_store.put)
+        return redis_store
+    store = TaskStore()
+    # Workers finish the stored task objects in place; restore them on completion so the
+    # TTL runs from when they finished, not from when they were registered
+    for event in (TaskEvent.TASK_COMPLETED, TaskEvent.TASK_FAILED):
+        task_queue.subscribe(event, store.put)
+    return store
+
+
+# Global task store instance
+task_store = create_task_store()
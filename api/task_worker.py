@@ -1,15 +1,40 @@
 import asyncio
 import logging
+import mimetypes
 import os
+from typing import Any
 
-from utils import get_file_manager
+from utils import gather_or_cancel, get_file_manager, io_concurrency
 
-from .ffmpeg_executor import FFmpegExecutor
+from .ffmpeg_executor import (
+    FFmpegExecutor,
+    encoder_cpu_count,
+    is_stream_copy,
+    read_stream_tail,
+    reap_on_error,
+)
 from .models import Task, TaskStatus
 from .task_queue import TaskEvent, task_queue
 
 logger = logging.getLogger(__name__)
 
+# libx264 preset used when merge-audio-video has to re-encode the video track
+X264_PRESET = os.getenv("X264_PRESET", "veryfast")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", None)
+# Tasks a worker takes from the queue at once and runs concurrently
+WORKER_BATCH_SIZE = max(1, int(os.getenv("WORKER_BATCH_SIZE", "4")))
+# Concurrency is split in two: FFmpeg runs are CPU bound and capped at the CPUs encoders
+# may use, while download/upload phases of many tasks may overlap freely up to IO_CONCURRENCY
+FFMPEG_CONCURRENCY = max(1, int(os.getenv("FFMPEG_CONCURRENCY", str(encoder_cpu_count()))))
+IO_CONCURRENCY = io_concurrency()
+_ffmpeg_semaphore = asyncio.Semaphore(FFMPEG_CONCURRENCY)
+_io_semaphore = asyncio.Semaphore(IO_CONCURRENCY)
+# Tasks that may wait between two pipeline stages of a worker
+PIPELINE_DEPTH = 2
+# Items passed from the download stage to the FFmpeg stage, and from there to the upload stage
+_FFmpegItem = tuple[Task, object, dict[str, str], dict[str, str]]
+_UploadItem = tuple[Task, object, dict[str, str]]
+
 
 class TaskWorker:
     """Worker that processes tasks from the queue."""
@@ -20,12 +45,14 @@ class TaskWorker:
         return get_file_manager()
 
     def __init__(self, worker_id: int):
-        if "__MERGE_AUDIO_VIDEO__" not in self._task_handlers:
-            # Register the unbound method, not the bound one
-            self.register_task_handler("__MERGE_AUDIO_VIDEO__")(TaskWorker.handle_merge_audio_video)
         self.worker_id = worker_id
-        self.s3_url = os.getenv("S3_ENDPOINT_URL", None)
+        self.s3_url = S3_ENDPOINT_URL
         self.running = False
+        self._stop_event = asyncio.Event()
+        # Default tasks handed to the pipeline and not yet released, with their file manager
+        self._in_pipeline: dict[str, tuple[Task, object]] = {}
+        # Tasks run by a registered handler; a cancelled one stays here so it can be failed
+        self._in_handlers: dict[str, Task] = {}
 
     @classmethod
     def register_task_handler(cls, command_name):
@@ -36,9 +63,7 @@ class TaskWorker:
         return decorator
 
     async def process_task(self, task: Task) -> None:
-        logger.info(f"Worker {self.worker_id}: Processing task {task.task_id}")
-        task.status = TaskStatus.RUNNING
-        await task_queue.publish(TaskEvent.TASK_STARTED, task)
+        await self._mark_running(task)
         try:
             handler = self._task_handlers.get(task.command)
             if handler:
@@ -46,127 +71,382 @@ class TaskWorker:
             else:
                 await self.handle_default_ffmpeg_task(task)
         except Exception as e:
-            task.status = TaskStatus.FAILED
-            task.error_message = str(e)
-            logger.error(f"Worker {self.worker_id}: Task {task.task_id} error: {str(e)}")
-            await task_queue.publish(TaskEvent.TASK_FAILED, task)
+            await self._mark_failed(task, str(e))
+
+    async def _mark_running(self, task: Task) -> None:
+        logger.info("Worker %s: Processing task %s", self.worker_id, task.task_id)
+        task.status = TaskStatus.RUNNING
+        await task_queue.publish(TaskEvent.TASK_STARTED, task)
+
+    async def _mark_failed(self, task: Task, error: str) -> None:
+        task.status = TaskStatus.FAILED
+        task.error_message = error
+        logger.error("Worker %s: Task %s error: %s", self.worker_id, task.task_id, error)
+        await task_queue.publish(TaskEvent.TASK_FAILED, task)
+
+    @staticmethod
+    async def _run_ffmpeg_argv(argv: list[str]) -> tuple[int, str]:
+        """Run an ffmpeg argv and return its exit code and the tail of its stderr."""
+        proc = await FFmpegExecutor.spawn(
+            argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        async with reap_on_error(proc):
+            error_tail = await read_stream_tail(proc.stderr) if proc.stderr else ""
+            return await proc.wait(), error_tail
+
+    @staticmethod
+    async def _stream_ffmpeg_to_s3(
+        file_manager, argv: list[str], s3_key: str, content_type: str
+    ) -> tuple[str | None, str]:
+        """Run an ffmpeg argv writing to stdout and upload that output to S3 as it is produced.
+
+        Returns the object URL (None if ffmpeg failed and the upload was aborted)
+        and the tail of ffmpeg's stderr.
+        """
+        proc = await FFmpegExecutor.spawn(
+            argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        assert proc.stderr is not None
+
+        async def succeeded() -> bool:
+            return await proc.wait() == 0
+
+        async with reap_on_error(proc):
+            error_tail, url = await asyncio.gather(
+                read_stream_tail(proc.stderr),
+                file_manager.upload_stream_to_s3(
+                    proc.stdout, s3_key, content_type, should_complete=succeeded
+                ),
+            )
+        return url, error_tail
 
     async def handle_merge_audio_video(self, task: Task) -> None:
         file_manager = self.get_file_manager()
+        try:
+            await self._merge_audio_video(task, file_manager)
+        finally:
+            await file_manager.aclose()
+
+    async def _merge_audio_video(self, task: Task, file_manager) -> None:
         video_url = task.input_files.get("video")
         if not video_url:
             raise Exception("Missing video input for merge-audio-video task")
-        video_local = await file_manager.download_file(video_url, "loop_video.mp4")
-        audio_files = []
+        audio_urls = []
         i = 0
         while True:
-            key = f"audio_{i}"
-            url = task.input_files.get(key)
+            url = task.input_files.get(f"audio_{i}")
             if not url:
                 break
-            fname = f"track_{i:03d}.mp3"
-            audio_files.append(await file_manager.download_file(url, fname))
+            audio_urls.append(url)
             i += 1
-        if not audio_files:
+        if not audio_urls:
             raise Exception("No audio files provided for merge-audio-video task")
+        # Resolved like in FFmpegExecutor.execute, and before anything is downloaded
+        ffmpeg = FFmpegExecutor.ffmpeg_path()
+        async with _io_semaphore:
+            video_local, *audio_files = await gather_or_cancel(
+                file_manager.download_file(video_url, "loop_video.mp4"),
+                *(
+                    file_manager.download_file(url, f"track_{i:03d}.mp3")
+                    for i, url in enumerate(audio_urls)
+                ),
+            )
         concat_list_path = os.path.join(file_manager.temp_dir, "concat.txt")
-        with open(concat_list_path, "w") as f:
-            for af in audio_files:
-                f.write(f"file '{os.path.abspath(af)}'\n")
+        # Downloaded paths are already absolute (temp_dir comes from mkdtemp).
+        # Single quotes are escaped for the concat demuxer as '\''.
+        manifest = "".join("file '{}'\n".format(af.replace("'", "'\\''")) for af in audio_files)
+        with open(concat_list_path, "w", buffering=1 << 16) as f:
+            f.write(manifest)
         merged_audio = os.path.join(file_manager.temp_dir, "merged_audio.mp3")
-        concat_cmd = f"ffmpeg -y -f concat -safe 0 -i {concat_list_path} -c copy {merged_audio}"
-        proc = await asyncio.create_subprocess_shell(
-            concat_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-        await proc.communicate()
-        probe_cmd = f"ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 {merged_audio}"
-        proc = await asyncio.create_subprocess_shell(
-            probe_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-        out, _ = await proc.communicate()
-        duration = float(out.decode().strip())
+        concat_argv = [
+            ffmpeg, "-y", "-f", "concat", "-safe", "0", "-i", concat_list_path,
+            "-c", "copy", merged_audio,
+        ]  # fmt: skip
         output_filename = next(iter(task.output_files.values()), "output.mp4")
-        output_path = file_manager.get_temp_file_path(output_filename)
-        merge_cmd = (
-            f"ffmpeg -y -stream_loop -1 -i {video_local} -i {merged_audio} "
-            f"-map 0:v -map 1:a -shortest -c:v libx264 -preset medium -crf 23 "
-            f"-c:a aac -b:a 128k -movflags +faststart -t {duration} {output_path}"
-        )
-        proc = await asyncio.create_subprocess_shell(
-            merge_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-        out, err = await proc.communicate()
-        if proc.returncode != 0 or not os.path.exists(output_path):
-            error_detail = err.decode() if err else out.decode()
-            file_manager.cleanup()
-            raise Exception(f"FFmpeg failed to create output file: {error_detail}")
         s3_key = f"youtube-merge/{task.task_id}/{output_filename}"
-        url = file_manager.upload_to_s3(output_path, s3_key)
+        content_type = mimetypes.guess_type(output_filename)[0] or "video/mp4"
+        merge_input = [
+            ffmpeg, "-y", "-stream_loop", "-1", "-i", video_local, "-i", merged_audio,
+            "-map", "0:v", "-map", "1:a", "-shortest",
+        ]  # fmt: skip
+        # -shortest ends the output with the (finite) merged audio, so no duration probe is needed.
+        # The MP4 is fragmented and written to stdout, which is uploaded while ffmpeg runs.
+        merge_output = [
+            "-c:a", "aac", "-b:a", "128k", "-movflags", "+frag_keyframe+empty_moov",
+            "-f", "mp4", "pipe:1",
+        ]  # fmt: skip
+        url = None
+        async with _ffmpeg_semaphore:
+            returncode, error_detail = await self._run_ffmpeg_argv(concat_argv)
+            if returncode == 0:
+                # Try a straight remux of the loop video first; only re-encode if copying fails
+                for video_codec in (
+                    ["-c:v", "copy"],
+                    ["-c:v", "libx264", "-preset", X264_PRESET, "-crf", "20"],
+                ):
+                    url, error_detail = await self._stream_ffmpeg_to_s3(
+                        file_manager, merge_input + video_codec + merge_output, s3_key, content_type
+                    )
+                    if url is not None:
+                        break
+        if url is None:
+            raise Exception(f"FFmpeg failed to create output file: {error_detail}")
         task.output_urls = {"video": url}
         task.status = TaskStatus.COMPLETED
         logger.info(
-            f"Worker {self.worker_id}: merge-audio-video task {task.task_id} completed successfully"
+            "Worker %s: merge-audio-video task %s completed successfully",
+            self.worker_id,
+            task.task_id,
         )
         await task_queue.publish(TaskEvent.TASK_COMPLETED, task)
-        file_manager.cleanup()
 
     async def handle_default_ffmpeg_task(self, task: Task) -> None:
         file_manager = self.get_file_manager()
-        logger.info(f"Worker {self.worker_id}: Downloading files for {task.task_id}")
-        local_files = await file_manager.download_files(task.input_files)
+        try:
+            local_files, output_local_paths = await self._download_inputs(task, file_manager)
+            await self._run_ffmpeg(task, local_files, output_local_paths)
+            await self._upload_outputs(task, file_manager, output_local_paths)
+        finally:
+            await file_manager.aclose()
+
+    async def _download_inputs(
+        self, task: Task, file_manager
+    ) -> tuple[dict[str, str], dict[str, str]]:
+        if is_stream_copy(task.command) and all(
+            url.startswith(("http://", "https://")) for url in task.input_files.values()
+        ):
+            # A pure remux is I/O bound, so ffmpeg reads the URLs itself instead of
+            # waiting for every input to land on disk first
+            logger.debug(
+                "Worker %s: Streaming inputs of %s over HTTP", self.worker_id, task.task_id
+            )
+            local_files = dict(task.input_files)
+        else:
+            logger.debug("Worker %s: Downloading files for %s", self.worker_id, task.task_id)
+            async with _io_semaphore:
+                local_files = await file_manager.download_files(task.input_files)
         output_local_paths: dict[str, str] = {}
         for out_key, out_name in task.output_files.items():
             output_local_paths[out_key] = file_manager.get_temp_file_path(out_name)
-        logger.info(f"Worker {self.worker_id}: Executing FFmpeg for {task.task_id}")
-        success, error_msg = await FFmpegExecutor.execute(
-            command_args=task.command,
-            input_files=local_files,
-            output_files=output_local_paths,
-        )
+        return local_files, output_local_paths
+
+    async def _run_ffmpeg(
+        self, task: Task, local_files: dict[str, str], output_local_paths: dict[str, str]
+    ) -> None:
+        logger.debug("Worker %s: Executing FFmpeg for %s", self.worker_id, task.task_id)
+        async with _ffmpeg_semaphore:
+            success, error_msg = await FFmpegExecutor.execute(
+                command_args=task.command,
+                input_files=local_files,
+                output_files=output_local_paths,
+            )
         if not success:
-            task.status = TaskStatus.FAILED
-            task.error_message = error_msg
-            logger.error(f"Worker {self.worker_id}: Task {task.task_id} failed: {error_msg}")
-            await task_queue.publish(TaskEvent.TASK_FAILED, task)
-            file_manager.cleanup()
-            return
-        logger.info(f"Worker {self.worker_id}: Uploading output for {task.task_id}")
-        task.output_urls = {}
-        for out_key, local_path in output_local_paths.items():
-            filename = task.output_files.get(out_key, out_key)
-            s3_key = f"ffmpeg-outputs/{task.task_id}/{filename}"
-            url = file_manager.upload_to_s3(local_path, s3_key)
-            task.output_urls[out_key] = url
+            raise Exception(error_msg)
+
+    async def _upload_outputs(
+        self, task: Task, file_manager, output_local_paths: dict[str, str]
+    ) -> None:
+        logger.debug("Worker %s: Uploading output for %s", self.worker_id, task.task_id)
+        # Upload all outputs of the task concurrently; if one fails the rest are cancelled
+        # (aborting their multipart uploads) before the task is failed and its files deleted
+        async with _io_semaphore:
+            urls = await gather_or_cancel(
+                *(
+                    file_manager.upload_to_s3_async(
+                        local_path,
+                        f"ffmpeg-outputs/{task.task_id}/{task.output_files.get(out_key, out_key)}",
+                    )
+                    for out_key, local_path in output_local_paths.items()
+                )
+            )
+        task.output_urls = dict(zip(output_local_paths.keys(), urls, strict=True))
         task.status = TaskStatus.COMPLETED
-        logger.info(f"Worker {self.worker_id}: Task {task.task_id} completed successfully")
+        logger.info("Worker %s: Task %s completed successfully", self.worker_id, task.task_id)
         await task_queue.publish(TaskEvent.TASK_COMPLETED, task)
-        file_manager.cleanup()
+
+    async def _run_task(self, task: Task) -> None:
+        self._in_handlers[task.task_id] = task
+        try:
+            await self.process_task(task)
+            self._in_handlers.pop(task.task_id, None)
+        finally:
+            await task_queue.task_done(task)
+
+    async def _dispatch(self, task: Task) -> None:
+        """Run a task with a registered handler, or hand a default task to the pipeline."""
+        if task.command in self._task_handlers:
+            await self._run_task(task)
+            return
+        await self._mark_running(task)
+        self._in_pipeline[task.task_id] = (task, None)
+        # Blocks while the pipeline is full, which keeps this worker from dequeuing more
+        await self._download_queue.put(task)
+
+    async def _finish_failed(self, task: Task, error: BaseException, file_manager) -> None:
+        """Mark a pipeline task failed and release it. Never raises, so the stage keeps going."""
+        try:
+            await self._mark_failed(task, str(error))
+        except Exception as e:
+            logger.error("Worker %s: Could not fail task %s: %s", self.worker_id, task.task_id, e)
+        await self._release(task, file_manager)
+
+    async def _release(self, task: Task, file_manager) -> None:
+        """Clean up after a pipeline task and acknowledge it; errors are logged, not raised."""
+        self._in_pipeline.pop(task.task_id, None)
+        try:
+            if file_manager is not None:
+                await file_manager.aclose()
+        except Exception as e:
+            logger.error("Worker %s: Cleanup of %s failed: %s", self.worker_id, task.task_id, e)
+        try:
+            await task_queue.task_done(task)
+        except Exception as e:
+            logger.error("Worker %s: Could not ack task %s: %s", self.worker_id, task.task_id, e)
+
+    async def _fail_in_pipeline(self, error: BaseException) -> None:
+        """Fail every task still held by the pipeline or cut short in a handler."""
+        for task, file_manager in list(self._in_pipeline.values()):
+            await self._finish_failed(task, error, file_manager)
+        # Interrupted handler tasks were already acknowledged by _run_task
+        for task in list(self._in_handlers.values()):
+            self._in_handlers.pop(task.task_id, None)
+            try:
+                await self._mark_failed(task, str(error))
+            except Exception as e:
+                logger.error(
+                    "Worker %s: Could not fail task %s: %s", self.worker_id, task.task_id, e
+                )
+
+    @staticmethod
+    def _check_stages(stages: list[asyncio.Task]) -> None:
+        """Raise if a pipeline stage has exited; stages only return after the shutdown None."""
+        for stage in stages:
+            if stage.done():
+                raise stage.exception() or RuntimeError("Pipeline stage exited unexpectedly")
+
+    # Default tasks flow through three stages connected by bounded queues, so one
+    # task's upload overlaps the next task's FFmpeg run and the one after's download.
+    # A None item shuts a stage down after it has passed it on. Each task's failure is
+    # caught and reported within the stage, so one bad task never stops the pipeline.
+
+    async def _download_stage(self) -> None:
+        while (task := await self._download_queue.get()) is not None:
+            file_manager = None
+            try:
+                file_manager = self.get_file_manager()
+                self._in_pipeline[task.task_id] = (task, file_manager)
+                local_files, output_local_paths = await self._download_inputs(task, file_manager)
+            except Exception as e:
+                await self._finish_failed(task, e, file_manager)
+                continue
+            await self._ffmpeg_queue.put((task, file_manager, local_files, output_local_paths))
+        await self._ffmpeg_queue.put(None)
+
+    async def _ffmpeg_stage(self) -> None:
+        while (item := await self._ffmpeg_queue.get()) is not None:
+            task, file_manager, local_files, output_local_paths = item
+            try:
+                await self._run_ffmpeg(task, local_files, output_local_paths)
+            except Exception as e:
+                await self._finish_failed(task, e, file_manager)
+                continue
+            await self._upload_queue.put((task, file_manager, output_local_paths))
+        await self._upload_queue.put(None)
+
+    async def _upload_stage(self) -> None:
+        while (item := await self._upload_queue.get()) is not None:
+            task, file_manager, output_local_paths = item
+            try:
+                await self._upload_outputs(task, file_manager, output_local_paths)
+            except Exception as e:
+                await self._finish_failed(task, e, file_manager)
+                continue
+            await self._release(task, file_manager)
 
     async def start(self) -> None:
         """Start the worker to process tasks from the queue."""
         self.running = True
-        logger.info(f"Worker {self.worker_id} started")
+        self._stop_event.clear()
+        self._download_queue: asyncio.Queue[Task | None] = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        self._ffmpeg_queue: asyncio.Queue[_FFmpegItem | None] = asyncio.Queue(
+            maxsize=PIPELINE_DEPTH
+        )
+        self._upload_queue: asyncio.Queue[_UploadItem | None] = asyncio.Queue(
+            maxsize=PIPELINE_DEPTH
+        )
+        stages = [
+            asyncio.create_task(self._download_stage()),
+            asyncio.create_task(self._ffmpeg_stage()),
+            asyncio.create_task(self._upload_stage()),
+        ]
+        logger.info("Worker %s started", self.worker_id)
 
         try:
             while self.running:
+                # Block on the queue and the stop event together instead of polling with a timeout
+                get_task = asyncio.create_task(task_queue.dequeue_many(WORKER_BATCH_SIZE))
+                stop_wait = asyncio.create_task(self._stop_event.wait())
+                # The stages are watched too, so a crashed one stops the worker instead of
+                # leaving _dispatch blocked on a queue nobody reads
                 try:
-                    # Get task from queue with timeout to allow graceful shutdown
-                    task = await asyncio.wait_for(task_queue.dequeue(), timeout=1.0)
-                    await self.process_task(task)
-                except TimeoutError:
-                    # No task available, continue waiting
-                    continue
-                except asyncio.CancelledError:
-                    logger.info(f"Worker {self.worker_id} cancelled")
+                    done, _ = await asyncio.wait(
+                        {get_task, stop_wait, *stages}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    stop_wait.cancel()
+                    if not get_task.done():
+                        get_task.cancel()
+                if get_task not in done:
+                    self._check_stages(stages)
                     break
+                dispatch = asyncio.ensure_future(
+                    asyncio.gather(*(self._dispatch(task) for task in get_task.result()))
+                )
+                watched: set[asyncio.Future[Any]] = {dispatch, *stages}
+                try:
+                    await asyncio.wait(watched, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if not dispatch.done():
+                        dispatch.cancel()
+                        # Let the cancelled handlers clean up before their tasks are failed
+                        await asyncio.gather(dispatch, return_exceptions=True)
+                self._check_stages(stages)
+                dispatch.result()
+            # Let the tasks already in the pipeline finish before returning
+            await self._download_queue.put(None)
+            await asyncio.gather(*stages)
+        except asyncio.CancelledError:
+            logger.info("Worker %s cancelled", self.worker_id)
         except Exception as e:
-            logger.error(f"Worker {self.worker_id} error: {str(e)}")
+            logger.error("Worker %s error: %s", self.worker_id, e)
+            await self._stop_stages(stages)
+            await self._fail_in_pipeline(e)
+        finally:
+            # Wait for the cancelled stages so their cleanup (e.g. aborting multipart
+            # uploads) runs before the caller closes the shared clients
+            await self._stop_stages(stages)
             self.running = False
 
+    @staticmethod
+    async def _stop_stages(stages: list[asyncio.Task]) -> None:
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+
     def stop(self) -> None:
         """Stop the worker."""
         self.running = False
-        logger.info(f"Worker {self.worker_id} stopped")
+        self._stop_event.set()
+        logger.info("Worker %s stopped", self.worker_id)
+
+
+# Built-in handlers are registered once at import, as unbound methods
+TaskWorker.register_task_handler("__MERGE_AUDIO_VIDEO__")(TaskWorker.handle_merge_audio_video)
+
+
+# Workers started by run_workers, with the task running them, for stop_workers
+_workers: list[TaskWorker] = []
+_workers_task: asyncio.Task | None = None
 
 
 async def run_workers(num_workers: int = 2) -> asyncio.Task | None:
@@ -178,10 +458,36 @@ async def run_workers(num_workers: int = 2) -> asyncio.Task | None:
     Returns:
         A task that runs all workers (can be used with asyncio.create_task)
     """
+    global _workers_task
     workers = [TaskWorker(worker_id=i) for i in range(num_workers)]
 
     async def run_all_workers():
         """Run all workers concurrently."""
         await asyncio.gather(*[worker.start() for worker in workers])
 
-    return asyncio.create_task(run_all_workers())
+    _workers.extend(workers)
+    _workers_task = asyncio.create_task(run_all_workers())
+    return _workers_task
+
+
+async def stop_workers(timeout: float | None = None) -> None:
+    """Stop taking new tasks and wait for the workers to finish the ones in flight.
+
+    Args:
+        timeout: Seconds to wait for the drain before cancelling the workers (None waits)
+    """
+    global _workers_task
+    for worker in _workers:
+        worker.stop()
+    _workers.clear()
+    if _workers_task is None:
+        return
+    try:
+        await asyncio.wait_for(asyncio.shield(_workers_task), timeout)
+    except TimeoutError:
+        logger.warning("Workers did not drain in time, cancelling in-flight tasks")
+        _workers_task.cancel()
+        # Let the cancelled tasks clean up before the caller closes the HTTP and S3 clients;
+        # asyncio.wait doesn't raise the workers' CancelledError into this coroutine
+        await asyncio.wait([_workers_task])
+    _workers_task = None
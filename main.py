@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from contextlib import asynccontextmanager
@@ -5,8 +6,10 @@ from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 
-from api import api, run_workers
-from utils import check_s3_connection
+from api import api, run_workers, stop_workers, task_store
+from api.file_manager import close_http_client
+from api.s3_singleton import S3ClientSingleton
+from utils import check_s3_connection_async, configure_s3_client
 
 
 @asynccontextmanager
@@ -17,10 +20,13 @@ async def lifespan(app: FastAPI):
     s3_bucket = os.getenv("S3_BUCKET", "ffmpeg-output")
     aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID", "")
     aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY", "")
-    aws_region = os.getenv("AWS_REGION", "")
+    aws_region = os.getenv("AWS_REGION", "us-east-1")
+
+    # Build the shared S3 client once, off the request path
+    app.state.s3_client = configure_s3_client()
 
     # Check S3 connection
-    if not check_s3_connection(
+    if not await check_s3_connection_async(
         s3_bucket=s3_bucket,
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
@@ -29,10 +35,15 @@ async def lifespan(app: FastAPI):
         print("⚠️  Warning: S3 connection check failed. Continuing with startup...", file=sys.stderr)
 
     await run_workers(num_workers=num_workers)
+    reaper = asyncio.create_task(task_store.run_reaper())
 
     yield
 
-    # Shutdown (cleanup code here if needed)
+    # Shutdown: finish in-flight tasks before the process exits
+    reaper.cancel()
+    await stop_workers(timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "300")))
+    await close_http_client()
+    S3ClientSingleton.close()
 
 
 def main() -> FastAPI:
@@ -0,0 +1,28 @@
+"""Placeholder substitution shared by the FFmpeg command simulators in these tests."""
+
+import re
+import string
+from functools import lru_cache
+
+_PLACEHOLDER_RE = re.compile(r"{{\s*([^}]+)\s*}}")
+# Names string.Template accepts as ${name}: ASCII identifiers only
+_TEMPLATE_ID_RE = re.compile(string.Template.idpattern, re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _compile_template(command: str) -> tuple[string.Template, frozenset[str]]:
+    """Rewrite {{ key }} placeholders as ${key} once per command template."""
+    keys = frozenset(match.group(1).strip() for match in _PLACEHOLDER_RE.finditer(command))
+    escaped = command.replace("$", "$$")
+    template = _PLACEHOLDER_RE.sub(lambda m: f"${{{m.group(1).strip()}}}", escaped)
+    return string.Template(template), keys
+
+
+def substitute_placeholders(command: str, subs: dict[str, str]) -> str:
+    """Replace {{ key }} placeholders found in subs, leaving any others as written."""
+    # Repeated commands reuse their compiled template; placeholders that are unknown
+    # or that Template can't name (e.g. non-ASCII keys) fall back to the regex
+    template, keys = _compile_template(command)
+    if keys <= subs.keys() and all(_TEMPLATE_ID_RE.fullmatch(key) for key in keys):
+        return template.substitute(subs)
+    return _PLACEHOLDER_RE.sub(lambda m: subs.get(m.group(1).strip(), m.group(0)), command)
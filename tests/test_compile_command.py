@@ -0,0 +1,44 @@
+from api.ffmpeg_executor import compile_command, is_stream_copy
+
+
+def test_substitutes_whole_and_embedded_placeholders():
+    build = compile_command("-i {{in_1}} -vf \"movie='{{ in_2 }}'\" -c copy {{out_1}}")
+    argv = build({"in_1": "/tmp/a b.mp4", "in_2": "/tmp/logo.png", "out_1": "/tmp/out.mp4"})
+    assert argv == [
+        "-i",
+        "/tmp/a b.mp4",
+        "-vf",
+        "movie='/tmp/logo.png'",
+        "-c",
+        "copy",
+        "/tmp/out.mp4",
+    ]
+
+
+def test_spaced_placeholders_are_single_arguments():
+    argv = compile_command("-i {{ in_1 }} -c copy {{  out_1 }}")(
+        {"in_1": "/tmp/a b.mp4", "out_1": "/tmp/out.mp4"}
+    )
+    assert argv == ["-i", "/tmp/a b.mp4", "-c", "copy", "/tmp/out.mp4"]
+
+
+def test_unknown_placeholders_are_left_unchanged():
+    argv = compile_command("-i {{in_1}} {{missing}}")({"in_1": "/tmp/a.mp4"})
+    assert argv == ["-i", "/tmp/a.mp4", "{{missing}}"]
+
+
+def test_builder_is_cached_per_template():
+    assert compile_command("-i {{in_1}} {{out_1}}") is compile_command("-i {{in_1}} {{out_1}}")
+
+
+def test_stream_copy_requires_every_codec_to_be_copy():
+    assert is_stream_copy("-i {{in_1}} -i {{in_2}} -c copy {{out_1}}")
+    assert is_stream_copy("-i {{in_1}} -c:v copy -acodec copy {{out_1}}")
+    assert not is_stream_copy("-i {{in_1}} -c:v copy -c:a aac {{out_1}}")
+    assert not is_stream_copy("-i {{in_1}} {{out_1}}")
+
+
+def test_filtered_commands_are_not_stream_copies():
+    assert not is_stream_copy("-i {{in_1}} -vf scale=320:-1 -c:a copy {{out_1}}")
+    assert not is_stream_copy("-i {{in_1}} -filter:a volume=2 -c copy {{out_1}}")
+    assert not is_stream_copy("-i {{in_1}} -i {{in_2}} -filter_complex hstack -c copy {{out_1}}")
@@ -5,9 +5,10 @@ Test to verify dynamic input/output support (in_1...in_n, out_1...out_n).
 Demonstrates that the implementation works with any number of inputs and outputs.
 """
 
-import re
 import shlex
 
+from placeholder_template import substitute_placeholders
+
 
 def test_dynamic_substitution(
     ffmpeg_command: str,
@@ -29,29 +30,12 @@ def test_dynamic_substitution(
         return shlex.quote(path)
 
     ordered_inputs = list(local_inputs.values())
-    pattern = re.compile(r"{{\s*([^}]+)\s*}}")
-
-    def replace_placeholder(match: re.Match) -> str:
-        key = match.group(1).strip()
-
-        # Handle output keys
-        if key in output_local_paths:
-            return q(output_local_paths[key])
-
-        # Handle in_N patterns
-        m = re.fullmatch(r"in_(\d+)", key)
-        if m:
-            idx = int(m.group(1)) - 1
-            if 0 <= idx < len(ordered_inputs):
-                return q(ordered_inputs[idx])
-
-        # Handle direct input key references
-        if key in local_inputs:
-            return q(local_inputs[key])
-
-        return match.group(0)
+    # Output keys win over in_N, which win over direct input key references
+    subs = {key: q(path) for key, path in local_inputs.items()}
+    subs.update((f"in_{i}", q(path)) for i, path in enumerate(ordered_inputs, 1))
+    subs.update((key, q(path)) for key, path in output_local_paths.items())
 
-    command_str = pattern.sub(replace_placeholder, ffmpeg_command)
+    command_str = substitute_placeholders(ffmpeg_command, subs)
 
     full_command = command_str.strip()
     if not full_command.startswith("ffmpeg"):
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from api.file_manager import FileManager
+
+
+def test_failed_download_cancels_the_others_before_raising():
+    finished = []
+
+    async def download_file(url: str, filename: str) -> str:
+        if url == "bad":
+            raise OSError("connection reset")
+        try:
+            await asyncio.sleep(10)
+        finally:
+            finished.append(filename)
+        return filename
+
+    async def run():
+        fm = FileManager("bucket", "key", "secret", s3_client=object())
+        fm.download_file = download_file
+        try:
+            with pytest.raises(OSError, match="connection reset"):
+                await fm.download_files({"slow": "good", "broken": "bad"})
+            # The slow download was cancelled and unwound before download_files raised
+            assert finished == ["slow"]
+        finally:
+            await fm.aclose()
+
+    asyncio.run(run())
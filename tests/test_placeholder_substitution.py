@@ -10,9 +10,10 @@ This test demonstrates:
 5. How S3 upload keys are generated
 """
 
-import re
 import shlex
 
+from placeholder_template import substitute_placeholders
+
 
 def simulate_placeholder_substitution(
     ffmpeg_command: str,
@@ -43,39 +44,17 @@ def simulate_placeholder_substitution(
     # Prepare ordered list of input paths for in_1, in_2, ...
     ordered_inputs = list(local_inputs.values())
 
-    # Replace {{ ... }} placeholders (from FFmpegExecutor.execute)
-    pattern = re.compile(r"{{\s*([^}]+)\s*}}")
-
-    def replace_placeholder(match: re.Match) -> str:
-        key = match.group(1).strip()
-
-        # output placeholder
-        if key in ("output_filename", "output", "output_path"):
-            if output_local_paths:
-                # Pick first output
-                return q(next(iter(output_local_paths.values())))
-            return match.group(0)
-
-        # named output keys (e.g. out_1)
-        if key in output_local_paths:
-            return q(output_local_paths[key])
-
-        # in_N placeholder
-        m = re.fullmatch(r"in_(\d+)", key)
-        if m:
-            idx = int(m.group(1)) - 1
-            if 0 <= idx < len(ordered_inputs):
-                return q(ordered_inputs[idx])
-            return match.group(0)
-
-        # direct input key (map key -> local path)
-        if key in local_inputs:
-            return q(local_inputs[key])
+    # Build one placeholder -> quoted path table (from FFmpegExecutor.execute).
+    # Later entries take precedence: direct input keys, in_N, named outputs,
+    # then the generic output placeholders (first output).
+    subs = {key: q(path) for key, path in local_inputs.items()}
+    subs.update((f"in_{i}", q(path)) for i, path in enumerate(ordered_inputs, 1))
+    subs.update((key, q(path)) for key, path in output_local_paths.items())
+    if output_local_paths:
+        first_output = q(next(iter(output_local_paths.values())))
+        subs.update(dict.fromkeys(("output_filename", "output", "output_path"), first_output))
 
-        return match.group(0)
-
-    # Apply placeholder substitution
-    command_str = pattern.sub(replace_placeholder, ffmpeg_command)
+    command_str = substitute_placeholders(ffmpeg_command, subs)
 
     # NOTE: FFmpegExecutor also does a non-placeholder replace for input_files keys,
     # but in our case, the keys ('in_1', 'in_2', ...) are NOT used as non-placeholder
@@ -122,6 +101,17 @@ payload = {
 }
 
 
+def test_non_ascii_placeholder_is_substituted():
+    result = simulate_placeholder_substitution(
+        "-i {{ vidéo }} -c copy {{out_1}}",
+        {"vidéo": "https://example.com/v.mp4"},
+        {"out_1": "o.mp4"},
+    )
+    assert result["ffmpeg_command"] == (
+        "ffmpeg -i '/tmp/ffmpeg-test-task-uuid/vidéo' -c copy /tmp/ffmpeg-test-task-uuid/o.mp4"
+    )
+
+
 if __name__ == "__main__":
     result = simulate_placeholder_substitution(
         ffmpeg_command=payload["ffmpeg_command"],
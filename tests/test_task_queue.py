@@ -0,0 +1,20 @@
+import asyncio
+
+from api.models import Task
+from api.task_queue import TaskQueue
+
+
+def make_task(task_id: str) -> Task:
+    return Task(task_id=task_id, command="-i {{in_1}} {{out_1}}", input_files={}, output_files={})
+
+
+def test_dequeue_many_takes_only_queued_tasks():
+    async def run():
+        queue = TaskQueue()
+        for task_id in ("a", "b", "c"):
+            await queue.enqueue(make_task(task_id))
+        first = await queue.dequeue_many(2)
+        second = await queue.dequeue_many(2)
+        return [t.task_id for t in first], [t.task_id for t in second]
+
+    assert asyncio.run(run()) == (["a", "b"], ["c"])
@@ -0,0 +1,63 @@
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+from api.models import Task, TaskStatus
+from api.task_store import TaskStore
+
+
+def make_task(task_id: str) -> Task:
+    return Task(task_id=task_id, command="-i {{in_1}} {{out_1}}", input_files={}, output_files={})
+
+
+def test_evicts_oldest_when_full():
+    store = TaskStore(maxsize=2)
+    for task_id in ("a", "b", "c"):
+        asyncio.run(store.put(make_task(task_id)))
+    assert asyncio.run(store.get("a")) is None
+    assert asyncio.run(store.get("b")) is not None
+    assert asyncio.run(store.get("c")) is not None
+    assert len(store) == 2
+
+
+def test_sweep_only_removes_finished_tasks():
+    store = TaskStore(ttl=0)
+    done = make_task("done")
+    done.status = TaskStatus.COMPLETED
+    pending = make_task("pending")
+    asyncio.run(store.put(done))
+    asyncio.run(store.put(pending))
+    store.sweep()
+    assert asyncio.run(store.get("done")) is None
+    assert asyncio.run(store.get("pending")) is pending
+
+
+def test_ttl_runs_from_when_the_task_finished(monkeypatch):
+    now = [0.0]
+    # api exports the store instance under the module's name, so look the module up directly
+    store_module = importlib.import_module("api.task_store")
+    monkeypatch.setattr(store_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    store = TaskStore(ttl=3600)
+    task = make_task("slow")
+    asyncio.run(store.put(task))
+    now[0] = 7200.0
+    task.status = TaskStatus.COMPLETED
+    asyncio.run(store.put(task))
+    now[0] = 7260.0
+    store.sweep()
+    assert asyncio.run(store.get("slow")) is task
+    now[0] = 10801.0
+    store.sweep()
+    assert asyncio.run(store.get("slow")) is None
+
+
+def test_evicts_finished_tasks_before_queued_ones():
+    store = TaskStore(maxsize=2)
+    queued = make_task("queued")
+    done = make_task("done")
+    done.status = TaskStatus.FAILED
+    asyncio.run(store.put(queued))
+    asyncio.run(store.put(done))
+    asyncio.run(store.put(make_task("new")))
+    assert asyncio.run(store.get("done")) is None
+    assert asyncio.run(store.get("queued")) is queued
@@ -0,0 +1,154 @@
+import asyncio
+
+from api import task_worker
+from api.models import Task, TaskStatus
+from api.task_queue import TaskEvent, TaskQueue
+
+
+class FakeFileManager:
+    temp_dir = "/tmp"
+
+    async def aclose(self) -> None:
+        pass
+
+
+class FlakyWorker(task_worker.TaskWorker):
+    """Worker whose first file manager fails to build; FFmpeg and S3 are stubbed out."""
+
+    def __init__(self, worker_id: int):
+        super().__init__(worker_id)
+        self.failures_left = 1
+
+    def get_file_manager(self):
+        if self.failures_left:
+            self.failures_left -= 1
+            raise OSError("No space left on device")
+        return FakeFileManager()
+
+    async def _download_inputs(self, task, file_manager):
+        return {}, {}
+
+    async def _run_ffmpeg(self, task, local_files, output_local_paths):
+        pass
+
+    async def _upload_outputs(self, task, file_manager, output_local_paths):
+        task.status = TaskStatus.COMPLETED
+        await task_worker.task_queue.publish(TaskEvent.TASK_COMPLETED, task)
+
+
+def test_pipeline_fails_one_task_and_keeps_processing(monkeypatch):
+    async def run():
+        queue = TaskQueue()
+        monkeypatch.setattr(task_worker, "task_queue", queue)
+        tasks = [
+            Task(task_id=f"t{i}", command="-i {{in_1}} {{out_1}}", input_files={}, output_files={})
+            for i in range(6)
+        ]
+        for task in tasks:
+            await queue.enqueue(task)
+        worker = FlakyWorker(worker_id=0)
+        runner = asyncio.create_task(worker.start())
+        await asyncio.wait_for(queue._queue.join(), timeout=5)
+        worker.stop()
+        await asyncio.wait_for(runner, timeout=5)
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert tasks[0].status == TaskStatus.FAILED
+    assert "No space left" in tasks[0].error_message
+    assert [t.status for t in tasks[1:]] == [TaskStatus.COMPLETED] * 5
+
+
+def test_crashed_stage_fails_the_tasks_it_held(monkeypatch):
+    async def run():
+        queue = TaskQueue()
+        monkeypatch.setattr(task_worker, "task_queue", queue)
+        task = Task(task_id="t0", command="-i {{in_1}} {{out_1}}", input_files={}, output_files={})
+        await queue.enqueue(task)
+        worker = FlakyWorker(worker_id=0)
+        worker.failures_left = 0
+
+        async def broken_stage():
+            await worker._ffmpeg_queue.get()
+            raise RuntimeError("stage crashed")
+
+        monkeypatch.setattr(worker, "_ffmpeg_stage", broken_stage)
+        await asyncio.wait_for(worker.start(), timeout=5)
+        return task
+
+    task = asyncio.run(run())
+    assert task.status == TaskStatus.FAILED
+    assert task.error_message == "stage crashed"
+
+
+def test_crashed_stage_fails_tasks_running_in_handlers(monkeypatch):
+    async def run():
+        queue = TaskQueue()
+        monkeypatch.setattr(task_worker, "task_queue", queue)
+        handled = Task(task_id="h0", command="__SLOW__", input_files={}, output_files={})
+        piped = Task(task_id="t0", command="-i {{in_1}} {{out_1}}", input_files={}, output_files={})
+        await queue.enqueue(handled)
+        await queue.enqueue(piped)
+        worker = FlakyWorker(worker_id=0)
+        worker.failures_left = 0
+
+        async def slow_handler(self, task):
+            await asyncio.sleep(30)
+
+        async def broken_stage():
+            await worker._ffmpeg_queue.get()
+            raise RuntimeError("stage crashed")
+
+        monkeypatch.setitem(task_worker.TaskWorker._task_handlers, "__SLOW__", slow_handler)
+        monkeypatch.setattr(worker, "_ffmpeg_stage", broken_stage)
+        await asyncio.wait_for(worker.start(), timeout=5)
+        return handled, piped
+
+    handled, piped = asyncio.run(run())
+    assert handled.status == TaskStatus.FAILED
+    assert handled.error_message == "stage crashed"
+    assert piped.status == TaskStatus.FAILED
+
+
+def test_merge_handler_cleans_up_when_a_download_fails(monkeypatch):
+    closed = []
+
+    class FailingDownloads(FakeFileManager):
+        async def download_file(self, url, filename):
+            raise OSError("connection reset")
+
+        async def aclose(self):
+            closed.append(True)
+
+    worker = task_worker.TaskWorker(worker_id=0)
+    monkeypatch.setattr(worker, "get_file_manager", FailingDownloads)
+    task = Task(
+        task_id="m0",
+        command="__MERGE_AUDIO_VIDEO__",
+        input_files={"video": "https://example.com/v.mp4", "audio_0": "https://example.com/a.mp3"},
+        output_files={"video": "out.mp4"},
+    )
+    monkeypatch.setattr(task_worker, "task_queue", TaskQueue())
+    asyncio.run(worker.process_task(task))
+    assert task.status == TaskStatus.FAILED
+    assert closed == [True]
+
+
+def test_cancelled_ffmpeg_run_kills_the_process(monkeypatch):
+    spawned = []
+
+    async def spawn(argv, **kwargs):
+        spawned.append(await asyncio.create_subprocess_exec("sleep", "30", **kwargs))
+        return spawned[-1]
+
+    monkeypatch.setattr(task_worker.FFmpegExecutor, "spawn", staticmethod(spawn))
+
+    async def run():
+        run_task = asyncio.create_task(task_worker.TaskWorker._run_ffmpeg_argv(["ffmpeg"]))
+        while not spawned:
+            await asyncio.sleep(0.01)
+        run_task.cancel()
+        await asyncio.wait([run_task])
+        return spawned[0].returncode
+
+    assert asyncio.run(run()) is not None
@@ -1,12 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-import sys
-from typing import TYPE_CHECKING
+import stat
+import tempfile
+import threading
+import time
+from collections.abc import Coroutine
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, TypedDict, TypeVar
 
 if TYPE_CHECKING:
     from api.file_manager import FileManager
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# head_bucket attempts in check_s3_connection. Each is a single request with 2 s timeouts
+# (no botocore retries), so with the backoff a check gives up within about 10 s.
+_S3_CHECK_ATTEMPTS = 3
+# A successful check is remembered on disk (tmpfs when available) so warm restarts within
+# _S3_CHECK_TTL seconds skip the network probe; S3_CHECK_CACHE="" disables the cache
+_S3_CHECK_CACHE = os.getenv(
+    "S3_CHECK_CACHE",
+    os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "ffmpeg_s3_ok"
+    ),
+)
+_S3_CHECK_TTL = 60.0
+
 
 def check_s3_connection(
     s3_bucket: str,
@@ -14,7 +38,13 @@ def check_s3_connection(
     aws_secret_access_key: str,
     aws_region: str,
 ) -> bool:
-    """Check S3 connection by listing buckets.
+    """Check S3 connection with a HEAD request on the bucket.
+
+    Transient failures (unreachable endpoint, timeouts, 5xx/throttling) are retried
+    up to _S3_CHECK_ATTEMPTS times with exponential backoff; errors that retrying
+    cannot fix, such as a missing bucket or bad credentials, fail immediately.
+    A success for the same bucket within the last _S3_CHECK_TTL seconds (possibly
+    from a previous process) is reused without contacting S3.
 
     Args:
         s3_bucket: S3 bucket name
@@ -25,6 +55,9 @@ def check_s3_connection(
     Returns:
         True if connection is successful, False otherwise
     """
+    from botocore.exceptions import ClientError, HTTPClientError
+    from botocore.exceptions import ConnectionError as BotoConnectionError
+
     try:
         from api.s3_singleton import S3ClientSingleton
 
@@ -33,23 +66,187 @@ def check_s3_connection(
             aws_secret_access_key=aws_secret_access_key,
             aws_region=aws_region,
         )
-        s3_client = S3ClientSingleton.get_client()
-        s3_client.head_bucket(Bucket=s3_bucket)
-        print(f"✓ S3 connection successful! Bucket '{s3_bucket}' is accessible.")
+        if _s3_check_cached(s3_bucket):
+            logger.info("S3 bucket %s was reachable moments ago, skipping the check", s3_bucket)
+            return True
+        s3_client = S3ClientSingleton.probe_client()
+        try:
+            for attempt in range(_S3_CHECK_ATTEMPTS):
+                try:
+                    s3_client.head_bucket(Bucket=s3_bucket)
+                    break
+                except (BotoConnectionError, HTTPClientError, ClientError) as e:
+                    if attempt == _S3_CHECK_ATTEMPTS - 1 or not _is_transient_s3_error(e):
+                        raise
+                    time.sleep(0.5 * 2**attempt)
+        finally:
+            s3_client.close()
+        logger.info("S3 connection successful, bucket %s is accessible", s3_bucket)
+        _remember_s3_check(s3_bucket)
         return True
     except Exception as e:
-        print(f"✗ S3 connection failed: {str(e)}", file=sys.stderr)
+        logger.error("S3 connection failed: %s", e)
         return False
 
 
-def get_file_manager() -> FileManager:
-    """Get a configured FileManager instance."""
-    from api.file_manager import FileManager
+def _s3_check_cached(s3_bucket: str) -> bool:
+    """Whether check_s3_connection succeeded for this bucket within the last _S3_CHECK_TTL."""
+    if not _S3_CHECK_CACHE:
+        return False
+    try:
+        # The directory is world-writable: only trust a regular file this user wrote
+        fd = os.open(_S3_CHECK_CACHE, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except OSError:
+        return False
+    with os.fdopen(fd, encoding="utf-8") as f:
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode) or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+            return False
+        if time.time() - st.st_mtime >= _S3_CHECK_TTL:
+            return False
+        return f.read() == s3_bucket
 
-    return FileManager(
-        s3_bucket=os.getenv("S3_BUCKET", "ffmpeg-output"),
+
+def _remember_s3_check(s3_bucket: str) -> None:
+    """Record a successful check; written aside and renamed so readers never see half of it."""
+    if not _S3_CHECK_CACHE:
+        return
+    cache_dir, cache_name = os.path.split(_S3_CHECK_CACHE)
+    try:
+        # mkstemp creates a new file with an unpredictable name (O_EXCL), so a planted
+        # symlink can't redirect the write; rename replaces the cache path itself
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir or None, prefix=f"{cache_name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(s3_bucket)
+            os.replace(tmp_path, _S3_CHECK_CACHE)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.debug("Could not write S3 check cache %s: %s", _S3_CHECK_CACHE, e)
+
+
+def _is_transient_s3_error(error: Exception) -> bool:
+    """Whether a failed S3 call may succeed when retried."""
+    from botocore.exceptions import ClientError
+
+    if not isinstance(error, ClientError):
+        return True  # Connection-level failures: DNS, connect/read timeouts, resets
+    code = error.response.get("Error", {}).get("Code", "")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+    return status >= 500 or code in ("SlowDown", "Throttling", "RequestTimeout")
+
+
+class S3Config(TypedDict):
+    """S3 settings, keyed like the FileManager arguments they are passed as."""
+
+    s3_bucket: str
+    aws_access_key_id: str
+    aws_secret_access_key: str
+    aws_region: str
+    s3_url: str | None
+
+
+@lru_cache(maxsize=1)
+def _s3_config() -> S3Config:
+    """S3 settings read from the environment once per process."""
+    s3_bucket = os.getenv("S3_BUCKET", "ffmpeg-output")
+    aws_region = os.getenv("AWS_REGION", "us-east-1")
+    # Credentials may be empty: startup only warns when the S3 check fails
+    if not s3_bucket or not aws_region:
+        raise ValueError("S3_BUCKET and AWS_REGION must not be empty")
+    return S3Config(
+        s3_bucket=s3_bucket,
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", ""),
         aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", ""),
-        aws_region=os.getenv("AWS_REGION", "us-east-1"),
-        s3_url=os.getenv("S3_ENDPOINT_URL", None),
+        aws_region=aws_region,
+        s3_url=os.getenv("S3_ENDPOINT_URL") or None,
+    )
+
+
+async def gather_or_cancel(*coros: Coroutine[Any, Any, T]) -> list[T]:
+    """Run coroutines concurrently and return their results in order, like asyncio.gather.
+
+    If one fails, the others are cancelled and awaited before its error is raised, so
+    callers can clean up (e.g. delete the temp dir) knowing nothing still writes to it.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(coro) for coro in coros]
+    except BaseExceptionGroup as errors:
+        # Raise the failure itself, as gather would, so task error messages stay readable
+        raise errors.exceptions[0] from None
+    return [task.result() for task in tasks]
+
+
+def usable_cpu_count() -> int:
+    """CPUs this process may run on (its affinity mask where the platform exposes one)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@lru_cache(maxsize=1)
+def io_concurrency() -> int:
+    """Download/upload phases that may run at once in this process (IO_CONCURRENCY).
+
+    I/O waits on the network, so the default oversubscribes the cores: 2 per CPU, at least 16.
+    """
+    default = max(16, 2 * usable_cpu_count())
+    return max(1, int(os.getenv("IO_CONCURRENCY", str(default))))
+
+
+async def check_s3_connection_async(
+    s3_bucket: str,
+    aws_access_key_id: str,
+    aws_secret_access_key: str,
+    aws_region: str,
+) -> bool:
+    """Run check_s3_connection in a daemon thread so the event loop is not blocked.
+
+    Unlike asyncio.to_thread, whose executor asyncio.run joins on exit, a slow check
+    does not hold up shutdown when the awaiting task is abandoned.
+    """
+    loop = asyncio.get_running_loop()
+    result: asyncio.Future[bool] = loop.create_future()
+
+    def deliver(ok: bool) -> None:
+        if not result.done():
+            result.set_result(ok)
+
+    def run() -> None:
+        ok = check_s3_connection(s3_bucket, aws_access_key_id, aws_secret_access_key, aws_region)
+        try:
+            loop.call_soon_threadsafe(deliver, ok)
+        except RuntimeError:
+            pass  # The loop closed while the check was running
+
+    threading.Thread(target=run, name="s3-check", daemon=True).start()
+    return await result
+
+
+def configure_s3_client():
+    """Configure the process-wide S3 client from the environment and return it.
+
+    Cheap after the first call: S3ClientSingleton reuses the client while the settings match.
+    """
+    from api.s3_singleton import S3ClientSingleton
+
+    config = _s3_config()
+    S3ClientSingleton.configure(
+        aws_access_key_id=config["aws_access_key_id"],
+        aws_secret_access_key=config["aws_secret_access_key"],
+        aws_region=config["aws_region"],
+        s3_url=config["s3_url"],
+    )
+    return S3ClientSingleton.get_client()
+
+
+def get_file_manager() -> FileManager:
+    """Get a configured FileManager instance sharing the process-wide S3 and HTTP clients."""
+    from api.file_manager import FileManager, get_http_client
+
+    return FileManager(
+        **_s3_config(), s3_client=configure_s3_client(), http_client=get_http_client()
     )
@@ -13,61 +13,167 @@ Environment variables:
     AWS_ACCESS_KEY_ID: AWS access key
     AWS_SECRET_ACCESS_KEY: AWS secret key
     AWS_REGION: AWS region (default: us-east-1)
+    S3_ENDPOINT_URL: Custom S3-compatible endpoint (optional)
     LOG_LEVEL: Logging level (default: INFO)
+    SHUTDOWN_TIMEOUT: Seconds to let in-flight tasks finish on SIGINT/SIGTERM (default: 300)
 """
 
 import asyncio
 import logging
+import logging.config
 import os
+import signal
 import sys
 from argparse import ArgumentParser
+from dataclasses import dataclass, replace
+from functools import lru_cache
 
-from api.task_worker import run_workers
 
-# Configure logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+@dataclass(frozen=True)
+class WorkerConfig:
+    """Worker settings, read from the environment once per process."""
+
+    num_workers: int
+    log_level: str
+    s3_bucket: str
+    aws_access_key_id: str
+    aws_secret_access_key: str
+    aws_region: str
+    shutdown_timeout: float
+
+
+def _env_number(name: str, default: str, cast: type[int] | type[float]):
+    """Parse a numeric environment variable, exiting with a clear message if it is invalid."""
+    value = os.getenv(name, default)
+    try:
+        return cast(value)
+    except ValueError:
+        raise SystemExit(f"Invalid {name}={value!r}: expected {cast.__name__}") from None
+
+
+@lru_cache(maxsize=1)
+def _load_config() -> WorkerConfig:
+    return WorkerConfig(
+        num_workers=_env_number("NUM_WORKERS", "2", int),
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        s3_bucket=os.getenv("S3_BUCKET", "ffmpeg-output"),
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", ""),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", ""),
+        aws_region=os.getenv("AWS_REGION", "us-east-1"),
+        shutdown_timeout=_env_number("SHUTDOWN_TIMEOUT", "300", float),
+    )
+
+
+# Configure logging: one formatter and one handler on the root logger, shared by every module
+logging.config.dictConfig(
+    {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"},
+        },
+        "handlers": {
+            "console": {"class": "logging.StreamHandler", "formatter": "default"},
+        },
+        "root": {"level": _load_config().log_level, "handlers": ["console"]},
+    }
 )
 logger = logging.getLogger(__name__)
 
 
+def _report_s3_check(check: asyncio.Task) -> None:
+    if not check.cancelled() and not check.result():
+        logger.warning("S3 connection check failed. Continuing with startup...")
+
+
 async def main():
     """Run the task workers."""
+    config = _load_config()
     parser = ArgumentParser(description="FFmpeg API Task Worker")
     parser.add_argument(
         "--num-workers",
         type=int,
-        default=int(os.getenv("NUM_WORKERS", "2")),
+        default=config.num_workers,
         help="Number of concurrent workers",
     )
     parser.add_argument(
         "--log-level",
-        default=os.getenv("LOG_LEVEL", "INFO"),
+        default=config.log_level,
         help="Logging level",
     )
 
+    # Command-line flags only override the environment-derived settings
     args = parser.parse_args()
+    config = replace(config, num_workers=args.num_workers, log_level=args.log_level)
+
+    # Imported after argument parsing so --help doesn't load the api package, boto3 and httpx
+    from api.file_manager import close_http_client
+    from api.s3_singleton import S3ClientSingleton
+    from api.task_worker import run_workers, stop_workers
+    from utils import check_s3_connection_async, configure_s3_client
 
     # Update logging level
-    logging.getLogger().setLevel(args.log_level)
+    logging.getLogger().setLevel(config.log_level)
+
+    num_workers = config.num_workers
 
-    # Get configuration
-    num_workers = args.num_workers
+    s3_bucket = config.s3_bucket
+    logger.info("Starting %d worker(s)", num_workers)
+    logger.info("S3 Bucket: %s", s3_bucket)
 
-    s3_bucket = os.getenv("S3_BUCKET", "ffmpeg-output")
-    logger.info(f"Starting {num_workers} worker(s)")
-    logger.info(f"S3 Bucket: {s3_bucket}")
+    # Build the shared S3 client (and load botocore's service model) before the first task
+    configure_s3_client()
+
+    # Check S3 in a background thread so the blocking head_bucket call stays off the event loop.
+    # All workers share one client, so a single probe covers them; it runs while they start,
+    # and shutdown does not wait for it.
+    s3_check = asyncio.create_task(
+        check_s3_connection_async(
+            s3_bucket=s3_bucket,
+            aws_access_key_id=config.aws_access_key_id,
+            aws_secret_access_key=config.aws_secret_access_key,
+            aws_region=config.aws_region,
+        )
+    )
+    s3_check.add_done_callback(_report_s3_check)
+
+    # SIGINT/SIGTERM stop dequeuing and let in-flight tasks (and their uploads) finish
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_requested.set)
+        except NotImplementedError:
+            pass  # Not supported on this platform; Ctrl+C cancels instead
 
     try:
-        # Run workers
-        await run_workers(num_workers=num_workers)
-    except KeyboardInterrupt:
-        logger.info("Shutting down workers...")
+        # Run workers until they exit or a shutdown signal arrives
+        runner = await run_workers(num_workers=num_workers)
+        if runner is not None:
+            stop_wait = asyncio.create_task(stop_requested.wait())
+            await asyncio.wait({runner, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+            stop_wait.cancel()
+            if stop_requested.is_set():
+                logger.info("Shutting down workers...")
+                await stop_workers(timeout=config.shutdown_timeout)
     except Exception as e:
-        logger.error(f"Worker error: {e}")
+        logger.error("Worker error: %s", e)
         sys.exit(1)
+    finally:
+        await close_http_client()
+        if s3_check.done():
+            S3ClientSingleton.close()
+        else:
+            # The probe thread is still using the client; leave it to process exit
+            s3_check.remove_done_callback(_report_s3_check)
+            s3_check.cancel()
+            logger.warning("S3 connection check did not finish before shutdown")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop ships with uvicorn[standard]; fall back to the default loop without it
+    try:
+        from uvloop import new_event_loop as loop_factory
+    except ImportError:
+        loop_factory = None
+    asyncio.run(main(), loop_factory=loop_factory)